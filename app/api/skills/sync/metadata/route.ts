@@ -0,0 +1,91 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { prisma } from '@/lib/prisma';
+
+const SYNC_API_KEY = process.env.SYNC_API_KEY;
+const BATCH_SIZE = 50;
+
+function isAuthorized(req: NextRequest) {
+    const authHeader = req.headers.get('authorization');
+    return !!SYNC_API_KEY && authHeader === `Bearer ${SYNC_API_KEY}`;
+}
+
+// List id, source and freshness fields of every skill (used by the scraper's --refresh-metadata mode)
+export async function GET(req: NextRequest) {
+    if (!isAuthorized(req)) {
+        return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+
+    const rows = await prisma.skill.findMany({
+        select: { id: true, sourceRepo: true, sourcePath: true, stars: true, lastUpdated: true },
+    });
+
+    return NextResponse.json({
+        skills: rows.map((r) => ({
+            id: r.id,
+            source_repo: r.sourceRepo,
+            source_path: r.sourcePath,
+            stars: r.stars,
+            lastUpdated: r.lastUpdated.toISOString().slice(0, 10),
+        })),
+    });
+}
+
+// Patch only stars and lastUpdated by id; other fields are left untouched
+export async function POST(req: NextRequest) {
+    if (!isAuthorized(req)) {
+        return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+
+    const body = await req.json();
+    const skills: any[] = body.skills;
+
+    if (!Array.isArray(skills) || skills.length === 0) {
+        return NextResponse.json({ error: 'skills array is required' }, { status: 400 });
+    }
+
+    let updated = 0;
+    let missing = 0;
+    let skipped = 0;
+    const errors: string[] = [];
+
+    for (let i = 0; i < skills.length; i += BATCH_SIZE) {
+        const batch = skills.slice(i, i + BATCH_SIZE);
+
+        const promises = batch.map(async (skill) => {
+            if (!skill.id) {
+                skipped++;
+                return;
+            }
+
+            const data: { stars?: number; lastUpdated?: Date } = {};
+            if (skill.stars !== undefined) data.stars = Number(skill.stars) || 0;
+            if (skill.lastUpdated) {
+                const lastUpdated = new Date(skill.lastUpdated);
+                if (!isNaN(lastUpdated.getTime())) data.lastUpdated = lastUpdated;
+            }
+            if (Object.keys(data).length === 0) {
+                skipped++;
+                return;
+            }
+
+            try {
+                const result = await prisma.skill.updateMany({ where: { id: skill.id }, data });
+                if (result.count > 0) updated++;
+                else missing++;
+            } catch (e: any) {
+                errors.push(`${skill.id}: ${e.message}`);
+            }
+        });
+
+        await Promise.all(promises);
+    }
+
+    return NextResponse.json({
+        ok: true,
+        total: skills.length,
+        updated,
+        missing,
+        skipped,
+        errors: errors.length > 0 ? errors.slice(0, 20) : undefined,
+    });
+}
@@ -15,19 +15,32 @@ Key improvements over v1:
 - Proper error handling for 403/rate-limit responses
 """
 
+import argparse
 import requests
 import json
+import gzip
+import hashlib
+import hmac
+import queue
+import threading
 import os
 import sys
 import time
 import re
 import yaml
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from collections import defaultdict
 from dotenv import load_dotenv
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 load_dotenv()
 
@@ -42,9 +55,28 @@ DRY_RUN = os.getenv('DRY_RUN', 'false').lower() == 'true'
 DEBUG_LIMIT = int(os.getenv('DEBUG_LIMIT', '0')) or None
 # Max chars for longDesc in output JSON (0 = no limit)
 LONG_DESC_MAX = int(os.getenv('LONG_DESC_MAX', '3000'))
+# --- Time-boxed runs (0 = unlimited) ---
+# Wall-clock budget for the whole run; work is ordered by priority and stops before this
+RUN_DEADLINE_MINUTES = float(os.getenv('RUN_DEADLINE_MINUTES', '0'))
+# Seconds kept free at the end of the run for saving and DB sync
+DEADLINE_RESERVE_SECONDS = int(os.getenv('DEADLINE_RESERVE_SECONDS', '120'))
+LLM_CALL_BUDGET = int(os.getenv('LLM_CALL_BUDGET', '0'))
+LLM_TOKEN_BUDGET = int(os.getenv('LLM_TOKEN_BUDGET', '0'))
 # --- DB Sync (direct write to database via API) ---
 SYNC_API_URL = os.getenv('SYNC_API_URL', '')  # e.g. https://getclawkit.com/api/skills/sync
 SYNC_API_KEY = os.getenv('SYNC_API_KEY', '')
+# 'api' = POST to SYNC_API_URL; 'direct' = bulk upsert straight into Postgres at DATABASE_URL (needs psycopg)
+SYNC_MODE = os.getenv('SYNC_MODE', 'api').lower()
+DATABASE_URL = os.getenv('DATABASE_URL', '')
+GRAPHQL_API_URL = 'https://api.github.com/graphql'
+# --- Watch mode (push-event webhook receiver) ---
+WATCH_HOST = os.getenv('WATCH_HOST', '127.0.0.1')
+WATCH_PORT = int(os.getenv('WATCH_PORT', '8787'))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+# Seconds to wait for more push events before processing a batch
+WATCH_DEBOUNCE = float(os.getenv('WATCH_DEBOUNCE', '2'))
+# Seconds before the watcher refetches repo info (stars) for a repo
+WATCH_REPO_INFO_TTL = int(os.getenv('WATCH_REPO_INFO_TTL', '3600'))
 
 # --- Paths ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -53,9 +85,15 @@ SEEDS_FILE = os.path.join(DATA_DIR, "seeds.json")
 SKILLS_FILE = os.path.join(DATA_DIR, "skills.json")
 PROGRESS_FILE = os.path.join(DATA_DIR, ".scraper_progress.json")
 BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+SNAPSHOT_OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+SNAPSHOT_RUNS_DIR = os.path.join(BACKUP_DIR, "runs")
 
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
+# --- Snapshot retention: keep one per hour for this many hours, then one per day for this many days ---
+SNAPSHOT_KEEP_HOURLY = int(os.getenv('SNAPSHOT_KEEP_HOURLY', '24'))
+SNAPSHOT_KEEP_DAILY = int(os.getenv('SNAPSHOT_KEEP_DAILY', '30'))
+
 # Documentation file priority (prefer skill.md over readme.md)
 DOC_FILE_PRIORITY = ['skill.md', 'readme.md']
 
@@ -80,7 +118,16 @@ class GitHubClient:
         self.api_calls = 0
         self._rate_remaining = 5000
         self._rate_reset = 0
-        self._repo_info_cache = {}
+        # GraphQL has its own points quota, reported in the same X-RateLimit-* headers
+        self._graphql_remaining = 5000
+        self._graphql_reset = 0
+        self._repo_info_cache = {}  # repo -> (fetched_at, info)
+        # Seconds before cached repo info (stars) is refetched; None = cache for the whole session
+        self.repo_info_ttl = None
+        # Optional RunBudget: rate-limit sleeps never run past its deadline (minus reserve)
+        self.budget = None
+        # Set when the REST quota resets only after the deadline; callers should stop fetching
+        self.quota_exhausted = False
 
     def _update_rate(self, resp):
         """Track rate limit from response headers."""
@@ -91,11 +138,23 @@ class GitHubClient:
         if reset is not None:
             self._rate_reset = int(reset)
 
+    def _sleep_allowance(self):
+        """Seconds we may sleep before the run budget's reserve is reached (inf without a deadline)."""
+        if self.budget is None:
+            return float('inf')
+        return max(0, self.budget.time_left() - self.budget.reserve_seconds)
+
     def _wait_if_needed(self):
         """Sleep if rate limit is getting dangerously low."""
         if self._rate_remaining < 50:
             wait = max(0, self._rate_reset - time.time()) + 5
             if wait > 0 and wait < 3700:  # Don't sleep more than ~1 hour
+                if wait > self._sleep_allowance():
+                    # Sleeping would only burn time the LLM phase can use; let the caller defer instead
+                    if not self.quota_exhausted:
+                        print(f"   ⏰ Rate limit: {self._rate_remaining} left, reset is past the deadline. Not waiting")
+                    self.quota_exhausted = True
+                    return
                 print(f"   ⏳ Rate limit: {self._rate_remaining} left. Sleeping {int(wait)}s...")
                 time.sleep(wait)
 
@@ -111,7 +170,10 @@ class GitHubClient:
         # Handle rate-limit 403: sleep and retry once
         if resp.status_code == 403 and self._rate_remaining < 10:
             wait = max(0, self._rate_reset - time.time()) + 10
-            if wait > 0 and wait < 3700:
+            if wait > self._sleep_allowance():
+                print(f"   🚫 Rate limited until past the deadline, not retrying")
+                self.quota_exhausted = True
+            elif wait > 0 and wait < 3700:
                 print(f"   🚫 Rate limited! Sleeping {int(wait)}s then retrying...")
                 time.sleep(wait)
                 self.api_calls += 1
@@ -171,15 +233,107 @@ class GitHubClient:
         return None
 
     def get_repo_info(self, repo):
-        """Get repo metadata, cached per session (1 API call per unique repo)."""
-        if repo in self._repo_info_cache:
-            return self._repo_info_cache[repo]
+        """Get repo metadata, cached per session or for repo_info_ttl seconds (1 API call per unique repo)."""
+        cached = self._repo_info_cache.get(repo)
+        if cached and (self.repo_info_ttl is None or time.time() - cached[0] < self.repo_info_ttl):
+            return cached[1]
 
         r = self.api_get(f"https://api.github.com/repos/{repo}")
-        info = r.json() if r.status_code == 200 else {}
-        self._repo_info_cache[repo] = info
+        if r.status_code != 200:
+            return {}  # Not cached, so a rate-limited miss is retried on the next call
+        info = r.json()
+        self._repo_info_cache[repo] = (time.time(), info)
         return info
 
+    def get_dir_listing(self, repo, path, ref):
+        """
+        List a directory via the Contents API (1 API call). Returns [] only if the path no
+        longer exists as a directory (404); raises on rate limits, server errors and timeouts.
+        """
+        r = self.api_get(f"https://api.github.com/repos/{repo}/contents/{path}", params={'ref': ref})
+        if r.status_code == 404:
+            return []
+        r.raise_for_status()
+        listing = r.json()
+        return listing if isinstance(listing, list) else []
+
+    def get_compare_files(self, repo, base, head):
+        """
+        List paths changed between two commits (used when a push payload truncates its commit list).
+        Returns None if the comparison failed.
+        """
+        r = self.api_get(f"https://api.github.com/repos/{repo}/compare/{base}...{head}")
+        if r.status_code != 200:
+            print(f"   ❌ Cannot compare {base[:7]}...{head[:7]} in {repo}: {r.status_code}")
+            return None
+        paths = []
+        for f in r.json().get('files', []):
+            paths.append(f['filename'])
+            if f.get('previous_filename'):
+                paths.append(f['previous_filename'])
+        return paths
+
+    def graphql(self, query, variables=None):
+        """POST a GraphQL query. Tracks the GraphQL quota separately from the REST one."""
+        if self._graphql_remaining < 50:
+            wait = max(0, self._graphql_reset - time.time()) + 5
+            if wait > self._sleep_allowance():
+                print(f"   ⏰ GraphQL limit: {self._graphql_remaining} left, reset is past the deadline. Not waiting")
+            elif wait > 0 and wait < 3700:
+                print(f"   ⏳ GraphQL limit: {self._graphql_remaining} left. Sleeping {int(wait)}s...")
+                time.sleep(wait)
+        self.api_calls += 1
+        resp = self.session.post(
+            GRAPHQL_API_URL,
+            json={'query': query, 'variables': variables or {}},
+            timeout=60,
+        )
+        rem = resp.headers.get('X-RateLimit-Remaining')
+        reset = resp.headers.get('X-RateLimit-Reset')
+        if rem is not None:
+            self._graphql_remaining = int(rem)
+        if reset is not None:
+            self._graphql_reset = int(reset)
+        if resp.status_code != 200:
+            print(f"   ❌ GraphQL error {resp.status_code}: {resp.text[:200]}")
+            return {}
+        data = resp.json()
+        if data.get('errors'):
+            print(f"   ⚠️  GraphQL returned errors: {str(data['errors'])[:200]}")
+        return data.get('data') or {}
+
+    def get_path_last_commits(self, repo, paths, batch_size=50):
+        """
+        Get the last commit date (YYYY-MM-DD) for each path on the default branch.
+        Paths are batched as aliased history() fields, so N paths cost N/batch_size calls.
+        """
+        owner, name = repo.split('/', 1)
+        results = {}
+        for i in range(0, len(paths), batch_size):
+            batch = paths[i:i + batch_size]
+            fields = '\n'.join(
+                f'p{j}: history(first: 1, path: {json.dumps(path)}) {{ nodes {{ committedDate }} }}'
+                for j, path in enumerate(batch)
+            )
+            query = f"""query($owner: String!, $name: String!) {{
+  repository(owner: $owner, name: $name) {{
+    defaultBranchRef {{
+      target {{
+        ... on Commit {{
+          {fields}
+        }}
+      }}
+    }}
+  }}
+}}"""
+            data = self.graphql(query, {'owner': owner, 'name': name})
+            target = ((data.get('repository') or {}).get('defaultBranchRef') or {}).get('target') or {}
+            for j, path in enumerate(batch):
+                nodes = (target.get(f'p{j}') or {}).get('nodes') or []
+                if nodes:
+                    results[path] = nodes[0]['committedDate'][:10]
+        return results
+
     def print_rate_status(self):
         """Print current rate limit status."""
         r = self.api_get("https://api.github.com/rate_limit")
@@ -339,10 +493,119 @@ def build_skill_id(author, skill_name, seed):
         return f"community-{safe_repo}-{skill_name}".lower()
 
 
+def build_skill_record(client, info, seed, content, previous=None):
+    """
+    Build a skill record from a discovered doc file and its downloaded content.
+    lastUpdated is carried over from the previous version of the record (fetch time for new
+    skills); callers overwrite it with the real commit date when they have one.
+    The raw content is kept in '_raw_content' for LLM processing and must be popped before saving.
+    """
+    meta, body = parse_frontmatter(content)
+
+    # Get repo stars (cached per repo, NOT per skill)
+    repo_info = client.get_repo_info(seed['repo'])
+    stars = repo_info.get('stargazers_count', (previous or {}).get('stars', 0))
+
+    branch = seed.get('_branch', 'main')
+    skill_dir = info['doc_path'].rsplit('/', 1)[0]
+
+    fallback_name = info['skill_name'].replace('-', ' ').title()
+    fallback_desc = f"Skill by {info['author']}"
+
+    return {
+        "id": build_skill_id(info['author'], info['skill_name'], seed),
+        "name": _safe_str(meta.get('name'), fallback_name) or fallback_name,
+        "shortDesc": _safe_str(meta.get('description'), fallback_desc) or fallback_desc,
+        "longDesc": truncate_text(body, LONG_DESC_MAX) if LONG_DESC_MAX else body,
+        "author": info['author'],
+        "authorUrl": f"https://github.com/{info['author']}",
+        "stars": stars,
+        "lastUpdated": (previous or {}).get('lastUpdated') or datetime.now().strftime('%Y-%m-%d'),
+        "command": f"clawhub install {seed['repo']}/{skill_dir}",
+        "tags": _normalize_tags(meta.get('tags', [])),
+        "file_sha": info['doc_sha'],
+        "seo_content": None,
+        "downloadUrl": f"https://github.com/{seed['repo']}/tree/{branch}/{skill_dir}",
+        "source_repo": seed['repo'],
+        "source_path": skill_dir,
+        # Store raw content temporarily for LLM processing
+        "_raw_content": content,
+    }
+
+
+# ============================================================
+# Run Budget & Priority Scheduling
+# ============================================================
+class RunBudget:
+    """Tracks the wall-clock deadline and LLM call/token budget for a run. Thread-safe."""
+
+    def __init__(self, deadline_minutes=0, call_budget=0, token_budget=0, reserve_seconds=0):
+        self.deadline = time.time() + deadline_minutes * 60 if deadline_minutes else None
+        self.call_budget = call_budget
+        self.token_budget = token_budget
+        self.reserve_seconds = reserve_seconds
+        self.llm_calls = 0
+        self.llm_tokens = 0
+        self._lock = threading.Lock()
+
+    def time_left(self):
+        if self.deadline is None:
+            return float('inf')
+        return self.deadline - time.time()
+
+    def out_of_time(self):
+        """True once only the reserve (for saving and syncing) is left."""
+        return self.time_left() <= self.reserve_seconds
+
+    def try_acquire_llm(self):
+        """Reserve one LLM call. Returns False if time, calls or tokens are exhausted."""
+        with self._lock:
+            if self.out_of_time():
+                return False
+            if self.call_budget and self.llm_calls >= self.call_budget:
+                return False
+            if self.token_budget and self.llm_tokens >= self.token_budget:
+                return False
+            self.llm_calls += 1
+            return True
+
+    def charge_tokens(self, tokens):
+        with self._lock:
+            self.llm_tokens += tokens
+
+    def describe(self):
+        parts = []
+        if self.deadline is not None:
+            parts.append(f"deadline in {int(self.time_left() / 60)}m")
+        if self.call_budget:
+            parts.append(f"{self.call_budget} LLM calls")
+        if self.token_budget:
+            parts.append(f"{self.token_budget} LLM tokens")
+        return ', '.join(parts) or 'Unlimited'
+
+
+def skill_priority(skill_id, info, seed, existing, progress, repo_stars):
+    """
+    Sort key for Phase 2/3 work, most important first: higher stars, then new skills,
+    changed docs and records missing SEO content, then unchanged records (which are free).
+    """
+    old = progress.get(skill_id) or existing.get(skill_id)
+    if old is None:
+        rank = 0  # new skill
+    elif old.get('file_sha') != info['doc_sha']:
+        rank = 1  # changed doc
+    elif not old.get('seo_content'):
+        rank = 2  # missing SEO
+    else:
+        rank = 3  # unchanged
+    stars = old.get('stars', 0) if old else repo_stars.get(seed['repo'], 0)
+    return (rank == 3, -stars, rank)
+
+
 # ============================================================
 # LLM Integration
 # ============================================================
-def generate_seo_with_llm(skill_name, content, author):
+def generate_seo_with_llm(skill_name, content, author, budget=None):
     """
     Call LLM to generate natural-sounding descriptions.
     Returns dict with seo_title, seo_description, shortDesc, tags.
@@ -407,6 +670,8 @@ Return a JSON object with exactly these fields:
             timeout=90
         )
         if resp.status_code == 200:
+            if budget:
+                budget.charge_tokens((resp.json().get('usage') or {}).get('total_tokens', 0))
             raw = resp.json()['choices'][0]['message']['content']
             raw = raw.strip()
             if raw.startswith('```'):
@@ -425,6 +690,29 @@ Return a JSON object with exactly these fields:
     return None
 
 
+def apply_seo(record, seo_data):
+    """Merge an LLM response into a skill record."""
+    # Store the full LLM response as seo_content
+    record['seo_content'] = {
+        'seo_title': seo_data.get('seo_title', ''),
+        'seo_description': seo_data.get('seo_description', ''),
+    }
+    # Override generic shortDesc with LLM-generated one
+    llm_short = seo_data.get('shortDesc', '')
+    if llm_short and (
+        record['shortDesc'].startswith('Skill by')
+        or len(record['shortDesc']) < 20
+    ):
+        record['shortDesc'] = llm_short
+    # Override longDesc with LLM-generated one if available
+    llm_long = seo_data.get('longDesc', '')
+    if llm_long and len(llm_long) > 50:
+        record['longDesc'] = llm_long
+    # Use LLM tags if none from frontmatter
+    if seo_data.get('tags') and not record['tags']:
+        record['tags'] = seo_data['tags']
+
+
 # ============================================================
 # Progress Management
 # ============================================================
@@ -454,6 +742,886 @@ def load_progress(filename=PROGRESS_FILE):
     return {}
 
 
+# ============================================================
+# Snapshot Store (content-addressed record versions + per-run manifests)
+# ============================================================
+def _record_hash(record):
+    """Stable content hash of a skill record."""
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _snapshot_object_path(h):
+    return os.path.join(SNAPSHOT_OBJECTS_DIR, h[:2], f"{h}.json.gz")
+
+
+def _snapshot_run_path(run_id):
+    return os.path.join(SNAPSHOT_RUNS_DIR, f"{run_id}.json.gz")
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive advisory lock on path, shared by all scraper processes on this machine."""
+    if fcntl is None:  # Windows: no advisory locks, best effort
+        yield
+        return
+    with open(path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _snapshot_lock():
+    """
+    Exclusive lock around snapshot writes and pruning, so a concurrent prune (e.g. --watch
+    next to a cron run) cannot delete an object a new manifest is about to reference.
+    """
+    return _file_lock(os.path.join(BACKUP_DIR, '.snapshot.lock'))
+
+
+def _skills_file_lock():
+    """Exclusive lock around read-modify-write of skills.json (--watch next to full or refresh runs)."""
+    return _file_lock(SKILLS_FILE + '.lock')
+
+
+def snapshot_skills(skills, run_id=None):
+    """
+    Store a snapshot of the given records. Each record version is written once
+    (keyed by content hash); the run itself is only a compressed list of (id, hash).
+    Run IDs are timestamps; a numeric suffix is added if one already exists.
+    Returns (run_id, new_objects).
+    """
+    base_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+    entries = []
+    new_objects = 0
+
+    with _snapshot_lock():
+        for record in skills:
+            h = _record_hash(record)
+            entries.append([record['id'], h])
+            path = _snapshot_object_path(h)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            new_objects += 1
+
+        os.makedirs(SNAPSHOT_RUNS_DIR, exist_ok=True)
+        run_id = base_id
+        suffix = 0
+        while True:
+            try:
+                # 'x' fails if the manifest exists, so two runs in the same second never collide
+                with gzip.open(_snapshot_run_path(run_id), 'xt', encoding='utf-8') as f:
+                    json.dump({'run_id': run_id, 'records': entries}, f)
+                break
+            except FileExistsError:
+                suffix += 1
+                run_id = f"{base_id}_{suffix}"
+
+    return run_id, new_objects
+
+
+def list_snapshots():
+    """Return snapshot run IDs, oldest first."""
+    if not os.path.isdir(SNAPSHOT_RUNS_DIR):
+        return []
+    return sorted(n[:-len('.json.gz')] for n in os.listdir(SNAPSHOT_RUNS_DIR) if n.endswith('.json.gz'))
+
+
+def _resolve_snapshot(run_id):
+    """Accept an exact run ID or 'latest'."""
+    runs = list_snapshots()
+    if run_id == 'latest' and runs:
+        return runs[-1]
+    if run_id in runs:
+        return run_id
+    print(f"❌ Snapshot not found: {run_id}")
+    sys.exit(1)
+
+
+def _load_snapshot_manifest(run_id):
+    with gzip.open(_snapshot_run_path(run_id), 'rt', encoding='utf-8') as f:
+        return json.load(f)['records']
+
+
+def _load_snapshot_object(h):
+    with gzip.open(_snapshot_object_path(h), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def restore_snapshot(run_id):
+    """Write the records of a snapshot run back to skills.json."""
+    run_id = _resolve_snapshot(run_id)
+    skills = [_load_snapshot_object(h) for _, h in _load_snapshot_manifest(run_id)]
+    if DRY_RUN:
+        print(f"   🔍 DRY RUN: Would restore {len(skills)} skills from {run_id}")
+        return
+    with open(SKILLS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(skills, f, indent=2, ensure_ascii=False)
+    print(f"   ✅ Restored {len(skills)} skills from snapshot {run_id}")
+
+
+def diff_snapshots(run_a, run_b):
+    """
+    Print added/removed/changed skill IDs between two runs. IDs come from the manifests;
+    only the two versions of each changed record are loaded, to list the fields that differ.
+    """
+    run_a, run_b = _resolve_snapshot(run_a), _resolve_snapshot(run_b)
+    a = dict(_load_snapshot_manifest(run_a))
+    b = dict(_load_snapshot_manifest(run_b))
+
+    added = sorted(b.keys() - a.keys())
+    removed = sorted(a.keys() - b.keys())
+    changed = sorted(k for k in a.keys() & b.keys() if a[k] != b[k])
+
+    print(f"📊 {run_a} → {run_b}: +{len(added)} added, -{len(removed)} removed, ~{len(changed)} changed")
+    for sid in added:
+        print(f"   + {sid}")
+    for sid in removed:
+        print(f"   - {sid}")
+    for sid in changed:
+        old, new = _load_snapshot_object(a[sid]), _load_snapshot_object(b[sid])
+        fields = sorted(k for k in old.keys() | new.keys() if old.get(k) != new.get(k))
+        print(f"   ~ {sid} ({', '.join(fields)})")
+
+
+def prune_snapshots(now=None):
+    """
+    Apply the retention policy (newest run per hour for SNAPSHOT_KEEP_HOURLY hours,
+    then newest per day for SNAPSHOT_KEEP_DAILY days), then delete unreferenced objects.
+    Returns (runs_removed, objects_removed).
+    """
+    with _snapshot_lock():
+        return _prune_snapshots_locked(now or datetime.now())
+
+
+def _prune_snapshots_locked(now):
+    kept_buckets = set()
+    runs_removed = 0
+
+    for run_id in reversed(list_snapshots()):
+        try:
+            ts = datetime.strptime(run_id[:15], '%Y%m%d_%H%M%S')
+        except ValueError:
+            continue
+        age_hours = (now - ts).total_seconds() / 3600
+        if age_hours <= SNAPSHOT_KEEP_HOURLY:
+            bucket = ts.strftime('h%Y%m%d%H')
+        elif age_hours <= SNAPSHOT_KEEP_DAILY * 24:
+            bucket = ts.strftime('d%Y%m%d')
+        else:
+            bucket = None
+
+        if bucket and bucket not in kept_buckets:
+            kept_buckets.add(bucket)
+            continue
+        os.remove(_snapshot_run_path(run_id))
+        runs_removed += 1
+
+    if not runs_removed:
+        return 0, 0
+
+    referenced = set()
+    for run_id in list_snapshots():
+        referenced.update(h for _, h in _load_snapshot_manifest(run_id))
+
+    objects_removed = 0
+    for root, _, files in os.walk(SNAPSHOT_OBJECTS_DIR):
+        for name in files:
+            if name.endswith('.json.gz') and name[:-len('.json.gz')] not in referenced:
+                os.remove(os.path.join(root, name))
+                objects_removed += 1
+
+    return runs_removed, objects_removed
+
+
+def backup_skills(skills):
+    """Snapshot the current skills file contents and apply retention."""
+    run_id, new_objects = snapshot_skills(skills)
+    runs_removed, objects_removed = prune_snapshots()
+    print(f"   📋 Snapshot {run_id}: {new_objects} new of {len(skills)} records"
+          + (f" (pruned {runs_removed} runs, {objects_removed} objects)" if runs_removed else ""))
+
+
+# ============================================================
+# DB Sync
+# ============================================================
+def sync_enabled():
+    """Whether the configured SYNC_MODE has what it needs to write to the database."""
+    if SYNC_MODE == 'direct':
+        return bool(DATABASE_URL)
+    return bool(SYNC_API_URL and SYNC_API_KEY)
+
+
+def sync_to_db(records):
+    """Write records to the database using SYNC_MODE. Returns (synced, failed)."""
+    if SYNC_MODE == 'direct':
+        return _sync_via_postgres(records)
+    return _sync_via_api(records)
+
+
+def _sync_via_api(records, batch_size=200):
+    """POST records to the sync API in batches. Returns (synced, failed)."""
+    sync_ok = 0
+    sync_err = 0
+
+    for i in range(0, len(records), batch_size):
+        batch = records[i:i + batch_size]
+        try:
+            resp = requests.post(
+                SYNC_API_URL,
+                headers={
+                    "Authorization": f"Bearer {SYNC_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+                json={"skills": batch},
+                timeout=120,
+            )
+            if resp.status_code == 200:
+                result = resp.json()
+                sync_ok += result.get('created', 0) + result.get('updated', 0)
+                print(f"   [{i + len(batch)}/{len(records)}] +{result.get('created', 0)} new, ~{result.get('updated', 0)} updated")
+            else:
+                sync_err += len(batch)
+                print(f"   ❌ Batch {i}-{i + len(batch)} failed: {resp.status_code} {resp.text[:200]}")
+        except Exception as e:
+            sync_err += len(batch)
+            print(f"   ❌ Batch {i}-{i + len(batch)} error: {e}")
+
+    print(f"   ✅ DB sync: {sync_ok} synced, {sync_err} failed")
+    return sync_ok, sync_err
+
+
+def _sync_metadata_url():
+    """Partial-update endpoint next to the sync API (GET lists, POST patches stars/lastUpdated)."""
+    return SYNC_API_URL.rstrip('/') + '/metadata'
+
+
+def _pg_connect():
+    """Open a connection to DATABASE_URL, or return None if psycopg is not installed."""
+    try:
+        import psycopg
+    except ImportError:
+        print("   ❌ SYNC_MODE=direct requires psycopg: pip install 'psycopg[binary]'")
+        return None
+    return psycopg.connect(DATABASE_URL)
+
+
+def load_db_metadata():
+    """
+    Read id, source and freshness fields of every skill from the database.
+    Returns a list of {id, source_repo, source_path, stars, lastUpdated} or None on failure.
+    """
+    if SYNC_MODE == 'direct':
+        try:
+            conn = _pg_connect()
+            if conn is None:
+                return None
+            with conn, conn.cursor() as cur:
+                cur.execute('SELECT "id", "sourceRepo", "sourcePath", "stars", "lastUpdated" FROM "Skill"')
+                return [
+                    {'id': r[0], 'source_repo': r[1], 'source_path': r[2],
+                     'stars': r[3], 'lastUpdated': r[4].strftime('%Y-%m-%d')}
+                    for r in cur.fetchall()
+                ]
+        except Exception as e:
+            print(f"   ❌ Cannot read skills from database: {e}")
+            return None
+
+    try:
+        resp = requests.get(
+            _sync_metadata_url(),
+            headers={"Authorization": f"Bearer {SYNC_API_KEY}"},
+            timeout=120,
+        )
+        if resp.status_code == 200:
+            return resp.json().get('skills', [])
+        print(f"   ❌ Cannot read skills from {_sync_metadata_url()}: {resp.status_code} {resp.text[:200]}")
+    except Exception as e:
+        print(f"   ❌ Cannot read skills from {_sync_metadata_url()}: {e}")
+    return None
+
+
+def patch_db_metadata(patches, batch_size=500):
+    """
+    Update only stars and lastUpdated for the given [{id, stars, lastUpdated}]; other columns
+    are left untouched. Returns (updated, failed).
+    """
+    if SYNC_MODE == 'direct':
+        try:
+            conn = _pg_connect()
+            if conn is None:
+                return 0, len(patches)
+            with conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE "Skill" AS s
+                    SET "stars" = v.stars, "lastUpdated" = v.last_updated, "updatedAt" = now()
+                    FROM unnest(%s::text[], %s::int[], %s::timestamp[]) AS v(id, stars, last_updated)
+                    WHERE s."id" = v.id
+                      AND (s."stars", s."lastUpdated") IS DISTINCT FROM (v.stars, v.last_updated)
+                    """,
+                    (
+                        [p['id'] for p in patches],
+                        [p['stars'] for p in patches],
+                        [_parse_last_updated(p['lastUpdated']) for p in patches],
+                    ),
+                )
+                updated = cur.rowcount
+        except Exception as e:
+            print(f"   ❌ Direct DB patch error: {e}")
+            return 0, len(patches)
+        print(f"   ✅ DB patch (direct): {updated} updated")
+        return updated, 0
+
+    updated = 0
+    failed = 0
+    for i in range(0, len(patches), batch_size):
+        batch = patches[i:i + batch_size]
+        try:
+            resp = requests.post(
+                _sync_metadata_url(),
+                headers={
+                    "Authorization": f"Bearer {SYNC_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+                json={"skills": batch},
+                timeout=120,
+            )
+            if resp.status_code == 200:
+                result = resp.json()
+                updated += result.get('updated', 0)
+                print(f"   [{i + len(batch)}/{len(patches)}] ~{result.get('updated', 0)} updated, "
+                      f"{result.get('missing', 0)} missing")
+            else:
+                failed += len(batch)
+                print(f"   ❌ Batch {i}-{i + len(batch)} failed: {resp.status_code} {resp.text[:200]}")
+        except Exception as e:
+            failed += len(batch)
+            print(f"   ❌ Batch {i}-{i + len(batch)} error: {e}")
+
+    print(f"   ✅ DB patch: {updated} updated, {failed} failed")
+    return updated, failed
+
+
+# Columns of the Prisma "Skill" table written by the sync, in COPY order (see prisma/schema.prisma)
+SKILL_DB_COLUMNS = [
+    'id', 'name', 'shortDesc', 'longDesc', 'author', 'authorUrl', 'stars', 'lastUpdated',
+    'command', 'tags', 'fileSha', 'seoTitle', 'seoDesc', 'downloadUrl', 'sourceRepo', 'sourcePath',
+]
+
+
+def _parse_last_updated(value):
+    """
+    Parse a record's lastUpdated ('YYYY-MM-DD' or ISO timestamp) into a naive UTC datetime,
+    which is how Prisma stores DateTime in timestamp(3) columns. Falls back to now.
+    """
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _skill_to_db_row(skill):
+    """Map a skills.json record to a "Skill" row, mirroring the field mapping in /api/skills/sync."""
+    last_updated = _parse_last_updated(skill.get('lastUpdated'))
+    seo = skill.get('seo_content') or {}
+    try:
+        stars = int(skill.get('stars') or 0)
+    except (TypeError, ValueError):
+        stars = 0
+    return (
+        skill['id'],
+        str(skill.get('name') or ''),
+        str(skill.get('shortDesc') or ''),
+        str(skill.get('longDesc') or ''),
+        str(skill.get('author') or ''),
+        skill.get('authorUrl') or None,
+        stars,
+        last_updated,
+        str(skill.get('command') or ''),
+        [t for t in (skill.get('tags') or []) if isinstance(t, str)],
+        skill.get('file_sha') or None,
+        seo.get('seo_title') or None,
+        seo.get('seo_description') or None,
+        skill.get('downloadUrl') or None,
+        skill.get('source_repo') or None,
+        skill.get('source_path') or None,
+    )
+
+
+def _sync_via_postgres(records):
+    """
+    Bulk-load records into the "Skill" table: COPY into a temp staging table, then one
+    INSERT ... ON CONFLICT DO UPDATE that only touches rows whose content changed.
+    Everything runs in one transaction, so a bad row fails the whole batch.
+    Returns (synced, failed); records without an id are reported as skipped, not failed.
+    """
+    # One row per id (later records win), otherwise ON CONFLICT would hit the same row twice
+    rows = {}
+    skipped = 0
+    for skill in records:
+        if not skill.get('id'):
+            skipped += 1
+            continue
+        rows[skill['id']] = _skill_to_db_row(skill)
+
+    cols = ', '.join(f'"{c}"' for c in SKILL_DB_COLUMNS)
+    data_cols = [c for c in SKILL_DB_COLUMNS if c != 'id']
+    updates = ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in data_cols)
+    current = ', '.join(f'"Skill"."{c}"' for c in data_cols)
+    incoming = ', '.join(f'EXCLUDED."{c}"' for c in data_cols)
+
+    start = time.time()
+    try:
+        conn = _pg_connect()
+        if conn is None:
+            return 0, len(records)
+        with conn, conn.cursor() as cur:
+            cur.execute(
+                f'CREATE TEMP TABLE skill_stage ON COMMIT DROP AS SELECT {cols} FROM "Skill" WITH NO DATA'
+            )
+            with cur.copy(f'COPY skill_stage ({cols}) FROM STDIN') as copy:
+                for row in rows.values():
+                    copy.write_row(row)
+            # Unchanged rows are filtered by the WHERE and not returned; xmax = 0 marks fresh inserts
+            cur.execute(f"""
+                INSERT INTO "Skill" ({cols}, "updatedAt")
+                SELECT {cols}, now() FROM skill_stage
+                ON CONFLICT ("id") DO UPDATE SET {updates}, "updatedAt" = now()
+                WHERE ({current}) IS DISTINCT FROM ({incoming})
+                RETURNING (xmax = 0)
+            """)
+            results = [r[0] for r in cur.fetchall()]
+    except Exception as e:
+        print(f"   ❌ Direct DB sync error: {e}")
+        return 0, len(records)
+
+    created = sum(1 for inserted in results if inserted)
+    updated = len(results) - created
+    unchanged = len(rows) - len(results)
+    print(f"   ✅ DB sync (direct): +{created} new, ~{updated} updated, ={unchanged} unchanged, "
+          f"{skipped} skipped in {time.time() - start:.1f}s")
+    return created + updated, 0
+
+
+# ============================================================
+# Metadata Refresh (stars + lastUpdated only)
+# ============================================================
+def refresh_metadata():
+    """
+    Patch stars and lastUpdated without fetching content or calling the LLM.
+    Costs 1 REST call per repo plus 1 GraphQL call per 50 skill paths.
+
+    With DB sync configured, the catalog is read from the database and only those two
+    columns are written back; otherwise skills.json is refreshed in place.
+    """
+    if not GITHUB_TOKEN:
+        print("❌ GITHUB_TOKEN is required. Set it in .env or environment.")
+        sys.exit(1)
+
+    print("🔁 OpenClaw Skills Scraper v2.0 — metadata refresh")
+    print(f"   Source: {'database (SYNC_MODE=' + SYNC_MODE + ')' if sync_enabled() else os.path.basename(SKILLS_FILE)}")
+    print(f"   Dry Run: {DRY_RUN}")
+    print()
+
+    if sync_enabled():
+        catalog = load_db_metadata()
+        if catalog is None:
+            sys.exit(1)
+    elif os.path.exists(SKILLS_FILE):
+        with open(SKILLS_FILE, 'r') as f:
+            catalog = json.load(f)
+    else:
+        print(f"❌ Skills file not found: {SKILLS_FILE}")
+        sys.exit(1)
+
+    client = GitHubClient(GITHUB_TOKEN)
+    remaining = client.print_rate_status()
+    if remaining < 20:
+        print("❌ Rate limit too low. Try again later.")
+        sys.exit(1)
+
+    by_repo = defaultdict(list)
+    for record in catalog:
+        if record.get('source_repo') and record.get('source_path'):
+            by_repo[record['source_repo']].append(record)
+
+    patches = {}  # skill_id -> {id, stars, lastUpdated}
+    for repo, records in by_repo.items():
+        print(f"🌱 {repo}: {len(records)} skills")
+        stars = client.get_repo_info(repo).get('stargazers_count')
+        paths = sorted({r['source_path'] for r in records})
+        last_commits = client.get_path_last_commits(repo, paths)
+        print(f"   ⭐ {stars if stars is not None else '?'} stars, 📅 {len(last_commits)}/{len(paths)} commit dates")
+
+        for record in records:
+            new_stars = stars if stars is not None else record.get('stars', 0)
+            new_date = last_commits.get(record['source_path'], record.get('lastUpdated'))
+            if record.get('stars') != new_stars or record.get('lastUpdated') != new_date:
+                patches[record['id']] = {'id': record['id'], 'stars': new_stars, 'lastUpdated': new_date}
+
+    print(f"\n   ✅ {len(patches)} of {len(catalog)} records changed")
+    print(f"   GitHub API calls total: {client.api_calls}")
+
+    if not patches:
+        return
+
+    if DRY_RUN:
+        print(f"   🔍 DRY RUN: Would patch {len(patches)} skills")
+        return
+
+    if sync_enabled():
+        print(f"\n🔄 Patching {len(patches)} skills in database (stars, lastUpdated only)...")
+        patch_db_metadata(list(patches.values()))
+
+    # Keep the local file consistent with whatever was patched
+    if not os.path.exists(SKILLS_FILE):
+        return
+    with _skills_file_lock():
+        with open(SKILLS_FILE, 'r') as f:
+            skills = json.load(f)
+        if any(r['id'] in patches for r in skills):
+            backup_skills(skills)
+            for record in skills:
+                patch = patches.get(record['id'])
+                if patch:
+                    record['stars'] = patch['stars']
+                    record['lastUpdated'] = patch['lastUpdated']
+            skills.sort(key=lambda x: x.get('stars', 0), reverse=True)
+            with open(SKILLS_FILE, 'w', encoding='utf-8') as f:
+                json.dump(skills, f, indent=2, ensure_ascii=False)
+            print(f"   💾 Saved to {os.path.basename(SKILLS_FILE)}")
+
+
+# ============================================================
+# Watch Mode (push-event driven incremental updates)
+# ============================================================
+def skill_dir_from_path(path, seed):
+    """
+    Map a changed file path to (author, skill_name, skill_dir) for the given seed,
+    using the same layout rules as discover_skills_from_tree. Returns None if outside any skill.
+    """
+    prefix = seed['path']
+    if not path.startswith(prefix + '/'):
+        return None
+    parts = path[len(prefix) + 1:].split('/')
+
+    if seed['type'] == 'recursive_author':
+        if len(parts) < 3:
+            return None
+        author, skill_name = parts[0], parts[1]
+        return author, skill_name, f"{prefix}/{author}/{skill_name}"
+    if seed['type'] == 'flat':
+        if len(parts) < 2:
+            return None
+        skill_name = parts[0]
+        return seed['repo'].split('/')[0], skill_name, f"{prefix}/{skill_name}"
+    return None
+
+
+def _utc_date(timestamp):
+    """'YYYY-MM-DD' in UTC for an ISO timestamp (matching GraphQL committedDate dates); today if missing."""
+    try:
+        parsed = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    except ValueError:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime('%Y-%m-%d')
+
+
+def _webhook_signature(body):
+    return 'sha256=' + hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+class SkillWatcher:
+    """
+    Long-running worker that keeps the GitHub client, repo info cache and catalog in memory,
+    and reprocesses only the skill directories touched by incoming push events.
+    """
+
+    def __init__(self, client, seeds):
+        self.client = client
+        self.seeds = seeds
+        self.events = queue.Queue()
+        self.catalog = {}
+        self._catalog_mtime = None
+        self._reload_catalog()
+
+    def _reload_catalog(self):
+        """(Re)load skills.json if another run has rewritten it since we last read or wrote it."""
+        if not os.path.exists(SKILLS_FILE):
+            return
+        mtime = os.path.getmtime(SKILLS_FILE)
+        if mtime == self._catalog_mtime:
+            return
+        with open(SKILLS_FILE, 'r') as f:
+            self.catalog = {s['id']: s for s in json.load(f)}
+        self._catalog_mtime = mtime
+
+    def enqueue_push(self, payload):
+        """Validate a push payload and queue it. Returns a short status string for the HTTP response."""
+        repo = (payload.get('repository') or {}).get('full_name')
+        branch = (payload.get('repository') or {}).get('default_branch', 'main')
+        if not any(seed['repo'] == repo for seed in self.seeds):
+            return 'ignored: repo not in seeds'
+        if payload.get('ref') != f"refs/heads/{branch}":
+            return 'ignored: not default branch'
+        self.events.put(payload)
+        return 'queued'
+
+    def _changed_paths(self, payload):
+        """Paths touched by a push, or None if they cannot be determined."""
+        repo = payload['repository']['full_name']
+        commits = payload.get('commits') or []
+        # GitHub includes at most 20 commits in a push payload; fall back to the compare API
+        if len(commits) >= 20:
+            before, after = payload.get('before') or '', payload.get('after') or ''
+            if not after or not before.strip('0'):  # missing or all-zero SHA: nothing to compare against
+                return None
+            files = self.client.get_compare_files(repo, before, after)
+            return set(files) if files is not None else None
+        paths = set()
+        for c in commits:
+            for key in ('added', 'modified', 'removed'):
+                paths.update(c.get(key) or [])
+        return paths
+
+    def collect(self, payloads):
+        """
+        Merge payloads into {(repo, skill_dir): (seed, author, skill_name, branch, date)}.
+        Returns (touched, dropped) where dropped counts pushes whose changed files are unknown.
+        """
+        touched = {}
+        dropped = 0
+        for payload in payloads:
+            repo = payload['repository']['full_name']
+            branch = payload['repository'].get('default_branch', 'main')
+            date = _utc_date((payload.get('head_commit') or {}).get('timestamp'))
+            paths = self._changed_paths(payload)
+            if paths is None:
+                print(f"   ⚠️  Dropped push to {repo} ({(payload.get('after') or '')[:7]}): "
+                      f"cannot list changed files, the next full run will pick it up")
+                dropped += 1
+                continue
+            for path in paths:
+                for seed in self.seeds:
+                    if seed['repo'] != repo:
+                        continue
+                    hit = skill_dir_from_path(path, seed)
+                    if hit:
+                        author, skill_name, skill_dir = hit
+                        touched[(repo, skill_dir)] = (seed, author, skill_name, branch, date)
+        return touched, dropped
+
+    def process_skill(self, seed, author, skill_name, skill_dir, branch, date):
+        """
+        Rebuild one skill record. Returns ('updated', record), ('removed', skill_id),
+        ('kept', skill_id) when a rebuilt record got no SEO and the old one is kept, or (None, None).
+        """
+        skill_id = build_skill_id(author, skill_name, seed)
+        listing = self.client.get_dir_listing(seed['repo'], skill_dir, branch)
+        files = {item['name'].lower(): item for item in listing if item.get('type') == 'file'}
+        doc = next((files[name] for name in DOC_FILE_PRIORITY if name in files), None)
+
+        if not doc:
+            if self.catalog.pop(skill_id, None):
+                return 'removed', skill_id
+            return None, None
+
+        info = {
+            'author': author,
+            'skill_name': skill_name,
+            'doc_path': doc['path'],
+            'doc_sha': doc['sha'],
+        }
+
+        old = self.catalog.get(skill_id)
+        if old and old.get('file_sha') == info['doc_sha'] and old.get('seo_content'):
+            # Doc unchanged (e.g. only a script or reference file moved): just bump the date and stars
+            record = dict(old)
+            record['stars'] = self.client.get_repo_info(seed['repo']).get('stargazers_count', old.get('stars', 0))
+        else:
+            seed['_branch'] = branch
+            content = self.client.get_raw_file(seed['repo'], branch, info['doc_path'])
+            if not content:
+                return None, None
+            record = build_skill_record(self.client, info, seed, content, old)
+            seo_data = generate_seo_with_llm(record['name'], record['_raw_content'], record['author'])
+            if seo_data:
+                apply_seo(record, seo_data)
+            record.pop('_raw_content', None)
+            # Same rule as main(): never replace a record that has SEO with one that lost it
+            if old and old.get('seo_content') and not record.get('seo_content'):
+                return 'kept', skill_id
+
+        record['lastUpdated'] = date
+        self.catalog[skill_id] = record
+        return 'updated', record
+
+    def process(self, payloads):
+        """Apply a batch of push events to the catalog, save skills.json and sync changed records."""
+        touched, dropped = self.collect(payloads)
+        if not touched:
+            if dropped < len(payloads):
+                print("   ℹ️  Push touched no skill directories")
+            return
+
+        print(f"\n📨 {len(payloads)} push event(s), {len(touched)} skill dir(s) touched")
+        self._reload_catalog()
+        changed = []
+        removed = []
+        for (repo, skill_dir), (seed, author, skill_name, branch, date) in touched.items():
+            try:
+                status, result = self.process_skill(seed, author, skill_name, skill_dir, branch, date)
+            except Exception as e:
+                print(f"   ❌ {repo}/{skill_dir}: {e}")
+                continue
+            if status == 'updated':
+                changed.append(result)
+                print(f"   ✅ {result['id']}")
+            elif status == 'removed':
+                removed.append(result)
+                print(f"   🗑️  {result} (removed from skills.json; DB row left in place)")
+            elif status == 'kept':
+                print(f"   ⚠️  {result}: no new SEO, keeping previous version")
+
+        if not changed and not removed:
+            return
+
+        if DRY_RUN:
+            print(f"   🔍 DRY RUN: Would save {len(changed)} updated, {len(removed)} removed")
+            return
+
+        # Merge into the file as it is now, so a full run that finished meanwhile is not overwritten
+        with _skills_file_lock():
+            current = {}
+            if os.path.exists(SKILLS_FILE):
+                with open(SKILLS_FILE, 'r') as f:
+                    current = {s['id']: s for s in json.load(f)}
+            backup_skills(list(current.values()))
+            for record in changed:
+                current[record['id']] = record
+            for skill_id in removed:
+                current.pop(skill_id, None)
+            final_list = sorted(current.values(), key=lambda x: x.get('stars', 0), reverse=True)
+            with open(SKILLS_FILE, 'w', encoding='utf-8') as f:
+                json.dump(final_list, f, indent=2, ensure_ascii=False)
+            self.catalog = current
+            self._catalog_mtime = os.path.getmtime(SKILLS_FILE)
+
+        if changed and sync_enabled():
+            sync_to_db(changed)
+        print(f"   GitHub API calls total: {self.client.api_calls}")
+
+    def run_forever(self):
+        """Worker loop: block for an event, debounce briefly, then process the batch."""
+        while True:
+            payloads = [self.events.get()]
+            time.sleep(WATCH_DEBOUNCE)
+            while True:
+                try:
+                    payloads.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.process(payloads)
+            except Exception as e:
+                print(f"   ❌ Watch worker error: {e}")
+
+
+def _make_webhook_handler(watcher):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def _reply(self, code, message):
+            body = json.dumps({'status': message}).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if WEBHOOK_SECRET and not hmac.compare_digest(
+                    _webhook_signature(body), self.headers.get('X-Hub-Signature-256', '')):
+                return self._reply(401, 'bad signature')
+
+            event = self.headers.get('X-GitHub-Event', '')
+            if event == 'ping':
+                return self._reply(200, 'pong')
+            if event != 'push':
+                return self._reply(202, f'ignored: {event or "no"} event')
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                return self._reply(400, 'invalid JSON')
+            self._reply(202, watcher.enqueue_push(payload))
+
+        def log_message(self, fmt, *args):
+            print(f"   🌐 {self.address_string()} {fmt % args}")
+
+    return WebhookHandler
+
+
+def watch():
+    """Run the push-event webhook receiver with a warm client and in-memory catalog."""
+    if not GITHUB_TOKEN:
+        print("❌ GITHUB_TOKEN is required. Set it in .env or environment.")
+        sys.exit(1)
+    if not os.path.exists(SEEDS_FILE):
+        print(f"❌ Seeds file not found: {SEEDS_FILE}")
+        sys.exit(1)
+    with open(SEEDS_FILE, 'r') as f:
+        seeds = json.load(f)
+
+    print("👀 OpenClaw Skills Scraper v2.0 — watch mode")
+    print(f"   Listening on http://{WATCH_HOST}:{WATCH_PORT}/")
+    print(f"   Webhook secret: {'configured' if WEBHOOK_SECRET else '⚠️  NOT configured (signatures not checked)'}")
+    print(f"   Dry Run: {DRY_RUN}")
+
+    client = GitHubClient(GITHUB_TOKEN)
+    client.repo_info_ttl = WATCH_REPO_INFO_TTL
+    client.print_rate_status()
+    watcher = SkillWatcher(client, seeds)
+    print(f"   📊 Catalog loaded: {len(watcher.catalog)} skills")
+    print()
+
+    threading.Thread(target=watcher.run_forever, daemon=True).start()
+    server = ThreadingHTTPServer((WATCH_HOST, WATCH_PORT), _make_webhook_handler(watcher))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping watch mode")
+    finally:
+        server.server_close()
+
+
+def send_test_push(repo, paths, branch='main'):
+    """Local stand-in for GitHub: POST a minimal signed push payload to a running watcher."""
+    payload = {
+        'ref': f"refs/heads/{branch}",
+        'repository': {'full_name': repo, 'default_branch': branch},
+        'commits': [{'added': [], 'modified': list(paths), 'removed': []}],
+        'head_commit': {'timestamp': datetime.now().isoformat()},
+    }
+    body = json.dumps(payload).encode()
+    headers = {'Content-Type': 'application/json', 'X-GitHub-Event': 'push'}
+    if WEBHOOK_SECRET:
+        headers['X-Hub-Signature-256'] = _webhook_signature(body)
+    resp = requests.post(f"http://127.0.0.1:{WATCH_PORT}/", data=body, headers=headers, timeout=10)
+    print(f"   {resp.status_code} {resp.text}")
+
+
 # ============================================================
 # Main Pipeline
 # ============================================================
@@ -467,10 +1635,13 @@ def main():
     print(f"   LLM Concurrency: {LLM_CONCURRENCY}")
     print(f"   Debug Limit: {DEBUG_LIMIT or 'None (full scan)'}")
     print(f"   Long Desc Max: {LONG_DESC_MAX or 'Unlimited'}")
+    budget = RunBudget(RUN_DEADLINE_MINUTES, LLM_CALL_BUDGET, LLM_TOKEN_BUDGET, DEADLINE_RESERVE_SECONDS)
+    print(f"   Run Budget: {budget.describe()}")
     print(f"   Dry Run: {DRY_RUN}")
     print()
 
     client = GitHubClient(GITHUB_TOKEN)
+    client.budget = budget
     remaining = client.print_rate_status()
 
     if remaining < 20:
@@ -488,15 +1659,12 @@ def main():
     existing = {}
     if os.path.exists(SKILLS_FILE):
         with open(SKILLS_FILE, 'r') as f:
-            for s in json.load(f):
-                existing[s['id']] = s
-        # Backup current file
+            current = json.load(f)
+        for s in current:
+            existing[s['id']] = s
+        # Snapshot current file (only changed records cost disk)
         if not DRY_RUN:
-            ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_path = os.path.join(BACKUP_DIR, f"skills_{ts}.json")
-            with open(SKILLS_FILE, 'r') as src, open(backup_path, 'w') as dst:
-                dst.write(src.read())
-            print(f"   📋 Backed up to {os.path.basename(backup_path)}")
+            backup_skills(current)
     print(f"   📊 Existing skills in file: {len(existing)}")
 
     # Load progress from interrupted run
@@ -507,11 +1675,18 @@ def main():
     # Phase 1: Discover all skills via Trees API
     # ========================================
     all_discovered = []  # List of (info_dict, seed) tuples
+    unlisted = {}        # skill_id -> previous record, for seeds we ran out of quota on
 
     for seed in seeds:
         print(f"🌱 Seed: {seed['repo']} (type={seed['type']})")
 
         tree_items, branch = client.get_repo_tree(seed['repo'])
+        if not tree_items and client.quota_exhausted:
+            # The tree failed for lack of quota, not because the skills are gone: keep them as they are
+            kept = {sid: old for sid, old in existing.items() if old.get('source_repo') == seed['repo']}
+            unlisted.update(kept)
+            print(f"   ⏰ GitHub quota exhausted, keeping {len(kept)} existing skills")
+            continue
         if not tree_items:
             print(f"   ⚠️  Empty tree, skipping")
             continue
@@ -534,7 +1709,15 @@ def main():
         skill_id = build_skill_id(info['author'], info['skill_name'], seed)
         seen_ids[skill_id] = (info, seed)
 
-    all_discovered = list(seen_ids.values())
+    # Order work by priority so a time-boxed run spends its capacity on what matters most
+    repo_stars = defaultdict(int)
+    for old in existing.values():
+        if old.get('source_repo'):
+            repo_stars[old['source_repo']] = max(repo_stars[old['source_repo']], old.get('stars', 0))
+    all_discovered = [
+        seen_ids[sid] for sid in sorted(
+            seen_ids, key=lambda sid: skill_priority(sid, *seen_ids[sid], existing, progress, repo_stars))
+    ]
     total = len(all_discovered)
     print(f"\n📊 Total unique skills to process: {total}")
     print(f"   GitHub API calls used so far: {client.api_calls}")
@@ -545,11 +1728,13 @@ def main():
     # ========================================
     print("📥 Phase 2: Fetching content & building records...")
 
-    skills_map = {}  # skill_id -> record
+    skills_map = dict(unlisted)  # skill_id -> record
     needs_llm = []   # skill_ids that need LLM processing
     cached = 0
     fetched = 0
     skipped = 0
+    deferred = 0
+    fetched_by_repo = defaultdict(list)  # repo -> records rebuilt this run (need real commit dates)
 
     for idx, (info, seed) in enumerate(all_discovered):
         skill_id = build_skill_id(info['author'], info['skill_name'], seed)
@@ -575,6 +1760,17 @@ def main():
                 cached += 1
                 continue
 
+        # Check 3: Out of time or out of GitHub quota until past the deadline:
+        # keep the previous version (if any) and leave the rest for the next run
+        if budget.out_of_time() or client.quota_exhausted:
+            if deferred == 0:
+                reason = "Deadline reached" if budget.out_of_time() else "GitHub quota exhausted until past the deadline"
+                print(f"   ⏰ {reason}, deferring remaining fetches")
+            deferred += 1
+            if skill_id in existing:
+                skills_map[skill_id] = existing[skill_id]
+            continue
+
         # Need to fetch content
         branch = seed.get('_branch', 'main')
         content = client.get_raw_file(seed['repo'], branch, info['doc_path'])
@@ -583,47 +1779,23 @@ def main():
             continue
 
         fetched += 1
-        meta, body = parse_frontmatter(content)
-
-        # Get repo stars (cached per repo, NOT per skill)
-        repo_info = client.get_repo_info(seed['repo'])
-        stars = repo_info.get('stargazers_count', 0)
-
-        skill_dir = info['doc_path'].rsplit('/', 1)[0]
-
-        fallback_name = info['skill_name'].replace('-', ' ').title()
-        fallback_desc = f"Skill by {info['author']}"
-
-        record = {
-            "id": skill_id,
-            "name": _safe_str(meta.get('name'), fallback_name) or fallback_name,
-            "shortDesc": _safe_str(meta.get('description'), fallback_desc) or fallback_desc,
-            "longDesc": truncate_text(body, LONG_DESC_MAX) if LONG_DESC_MAX else body,
-            "author": info['author'],
-            "authorUrl": f"https://github.com/{info['author']}",
-            "stars": stars,
-            "lastUpdated": datetime.now().strftime('%Y-%m-%d'),
-            "command": f"clawhub install {seed['repo']}/{skill_dir}",
-            "tags": _normalize_tags(meta.get('tags', [])),
-            "file_sha": info['doc_sha'],
-            "seo_content": None,
-            "downloadUrl": f"https://github.com/{seed['repo']}/tree/{branch}/{skill_dir}",
-            "source_repo": seed['repo'],
-            "source_path": skill_dir,
-        }
-
-        # Store raw content temporarily for LLM processing
-        record['_raw_content'] = content
-
+        record = build_skill_record(client, info, seed, content, existing.get(skill_id))
         skills_map[skill_id] = record
         needs_llm.append(skill_id)
+        fetched_by_repo[seed['repo']].append(record)
 
         # Save progress periodically
         if fetched % 500 == 0 and not DRY_RUN:
             save_progress(skills_map)
             print(f"   💾 Progress saved ({len(skills_map)} skills)")
 
-    print(f"\n   ✅ Done: {cached} cached, {fetched} fetched, {skipped} skipped")
+    # Rebuilt records get the real last commit date of their skill dir (1 GraphQL call per 50 paths)
+    for repo, records in fetched_by_repo.items():
+        last_commits = client.get_path_last_commits(repo, sorted({r['source_path'] for r in records}))
+        for record in records:
+            record['lastUpdated'] = last_commits.get(record['source_path'], record['lastUpdated'])
+
+    print(f"\n   ✅ Done: {cached} cached, {fetched} fetched, {skipped} skipped, {deferred} deferred")
     print(f"   🤖 Need LLM: {len(needs_llm)} skills")
     print(f"   GitHub API calls total: {client.api_calls}")
 
@@ -634,40 +1806,27 @@ def main():
         print(f"\n🤖 Phase 3: Generating descriptions for {len(needs_llm)} skills (workers={LLM_CONCURRENCY})...")
 
         def process_one_llm(skill_id):
+            if not budget.try_acquire_llm():
+                return skill_id, None, False
             record = skills_map[skill_id]
             raw = record.get('_raw_content', record.get('longDesc', ''))
-            result = generate_seo_with_llm(record['name'], raw, record['author'])
-            return skill_id, result
+            result = generate_seo_with_llm(record['name'], raw, record['author'], budget)
+            return skill_id, result, True
 
         completed = 0
         failed = 0
+        llm_deferred = 0
+        # needs_llm is already in priority order; the pool picks up work in submission order
         with ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as executor:
             futures = {executor.submit(process_one_llm, sid): sid for sid in needs_llm}
             for future in as_completed(futures):
                 completed += 1
                 try:
-                    skill_id, seo_data = future.result()
-                    if seo_data and skill_id in skills_map:
-                        record = skills_map[skill_id]
-                        # Store the full LLM response as seo_content
-                        record['seo_content'] = {
-                            'seo_title': seo_data.get('seo_title', ''),
-                            'seo_description': seo_data.get('seo_description', ''),
-                        }
-                        # Override generic shortDesc with LLM-generated one
-                        llm_short = seo_data.get('shortDesc', '')
-                        if llm_short and (
-                            record['shortDesc'].startswith('Skill by')
-                            or len(record['shortDesc']) < 20
-                        ):
-                            record['shortDesc'] = llm_short
-                        # Override longDesc with LLM-generated one if available
-                        llm_long = seo_data.get('longDesc', '')
-                        if llm_long and len(llm_long) > 50:
-                            record['longDesc'] = llm_long
-                        # Use LLM tags if none from frontmatter
-                        if seo_data.get('tags') and not record['tags']:
-                            record['tags'] = seo_data['tags']
+                    skill_id, seo_data, attempted = future.result()
+                    if not attempted:
+                        llm_deferred += 1
+                    elif seo_data and skill_id in skills_map:
+                        apply_seo(skills_map[skill_id], seo_data)
                     else:
                         failed += 1
                 except Exception as e:
@@ -680,10 +1839,22 @@ def main():
                     if not DRY_RUN and completed % 500 == 0:
                         save_progress(skills_map)
 
-        print(f"   ✅ LLM complete: {completed - failed} succeeded, {failed} failed")
+        print(f"   ✅ LLM complete: {completed - failed - llm_deferred} succeeded, {failed} failed, {llm_deferred} deferred")
+        print(f"   LLM usage: {budget.llm_calls} calls, {budget.llm_tokens} tokens")
     elif needs_llm:
         print(f"\n⚠️  {len(needs_llm)} skills need LLM but LLM_API_KEY is not set. Skipping.")
 
+    # A rebuilt record whose LLM call was deferred or failed would lose the SEO it already had.
+    # Keep the previous version instead; its old file_sha makes the next run retry it first.
+    kept_previous = 0
+    for skill_id in needs_llm:
+        old = existing.get(skill_id)
+        if old and old.get('seo_content') and not skills_map[skill_id].get('seo_content'):
+            skills_map[skill_id] = old
+            kept_previous += 1
+    if kept_previous:
+        print(f"   ↩️  Kept previous version (with SEO) for {kept_previous} skills without new SEO")
+
     # ========================================
     # Phase 4: Clean up and save
     # ========================================
@@ -697,7 +1868,7 @@ def main():
     print(f"\n💾 Phase 4: Saving {len(final_list)} skills...")
 
     if not DRY_RUN:
-        with open(SKILLS_FILE, 'w', encoding='utf-8') as f:
+        with _skills_file_lock(), open(SKILLS_FILE, 'w', encoding='utf-8') as f:
             json.dump(final_list, f, indent=2, ensure_ascii=False)
 
         # Clean up progress file on successful completion
@@ -709,40 +1880,13 @@ def main():
         print(f"   🔍 DRY RUN: Would save {len(final_list)} skills")
 
     # ========================================
-    # Phase 5: Sync to database via API
+    # Phase 5: Sync to database (sync API or direct Postgres)
     # ========================================
-    if SYNC_API_URL and SYNC_API_KEY and not DRY_RUN:
+    if sync_enabled() and not DRY_RUN:
         print(f"\n🔄 Phase 5: Syncing {len(final_list)} skills to database...")
-        sync_batch_size = 200
-        sync_ok = 0
-        sync_err = 0
-
-        for i in range(0, len(final_list), sync_batch_size):
-            batch = final_list[i:i + sync_batch_size]
-            try:
-                resp = requests.post(
-                    SYNC_API_URL,
-                    headers={
-                        "Authorization": f"Bearer {SYNC_API_KEY}",
-                        "Content-Type": "application/json",
-                    },
-                    json={"skills": batch},
-                    timeout=120,
-                )
-                if resp.status_code == 200:
-                    result = resp.json()
-                    sync_ok += result.get('created', 0) + result.get('updated', 0)
-                    print(f"   [{i + len(batch)}/{len(final_list)}] +{result.get('created', 0)} new, ~{result.get('updated', 0)} updated")
-                else:
-                    sync_err += len(batch)
-                    print(f"   ❌ Batch {i}-{i + len(batch)} failed: {resp.status_code} {resp.text[:200]}")
-            except Exception as e:
-                sync_err += len(batch)
-                print(f"   ❌ Batch {i}-{i + len(batch)} error: {e}")
-
-        print(f"   ✅ DB sync: {sync_ok} synced, {sync_err} failed")
-    elif not SYNC_API_URL:
-        print(f"\n   ℹ️  SYNC_API_URL not set, skipping DB sync (file-only mode)")
+        sync_to_db(final_list)
+    elif not sync_enabled():
+        print(f"\n   ℹ️  DB sync not configured for SYNC_MODE={SYNC_MODE}, skipping (file-only mode)")
 
     # Final report
     print(f"\n{'=' * 50}")
@@ -767,4 +1911,33 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="OpenClaw Skills Scraper")
+    parser.add_argument('--refresh-metadata', action='store_true',
+                        help="Only refresh stars and lastUpdated (no content fetch, no LLM)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Run a webhook receiver that reprocesses skills touched by push events")
+    parser.add_argument('--send-test-push', nargs='+', metavar=('REPO', 'PATH'),
+                        help="Send a synthetic push event for REPO touching PATHs to a local --watch process")
+    parser.add_argument('--list-snapshots', action='store_true',
+                        help="List snapshot runs in data/backups")
+    parser.add_argument('--restore-snapshot', metavar='RUN',
+                        help="Restore skills.json from a snapshot run ID (or 'latest')")
+    parser.add_argument('--diff-snapshots', nargs=2, metavar=('RUN_A', 'RUN_B'),
+                        help="Show skills added/removed/changed between two snapshot runs")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch()
+    elif args.send_test_push:
+        send_test_push(args.send_test_push[0], args.send_test_push[1:])
+    elif args.list_snapshots:
+        for run_id in list_snapshots():
+            print(run_id)
+    elif args.restore_snapshot:
+        restore_snapshot(args.restore_snapshot)
+    elif args.diff_snapshots:
+        diff_snapshots(*args.diff_snapshots)
+    elif args.refresh_metadata:
+        refresh_metadata()
+    else:
+        main()